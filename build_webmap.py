@@ -12,8 +12,9 @@ for ft in data["features"]:
             for ring in geom["coordinates"]
         ]
     p = ft["properties"]
-    p["Gi_z"] = round(p["Gi_z"], 4)
-    p["Gi_p"] = round(p["Gi_p"], 4)
+    for k in p:
+        if k.startswith(("Gi_z", "Gi_p")):
+            p[k] = round(p[k], 4)
 
 geojson_str = json.dumps(data, separators=(",", ":"))
 
@@ -35,6 +36,30 @@ sig_cold = classes.get("Cold Spot 99%", 0) + classes.get("Cold Spot 95%", 0)
 max_z_r  = round(max_z, 4)
 min_z_r  = round(min_z, 3)
 
+# ── Per-amenity layers (class_<amenity> properties, if exported) ──────
+# Each entry carries its own header / info-panel figures, so the map can
+# show the statistics of whichever layer is selected.
+props0 = data["features"][0]["properties"] if data["features"] else {}
+layers = [{"key": "", "label": "All facilities", "maxZ": max_z_r,
+           "minZ": min_z_r, "fac": int(total_fac),
+           "sigHot": sig_hot, "sigCold": sig_cold}]
+for k in props0:
+    if k.startswith("class_"):
+        cat   = k[len("class_"):]
+        props = [ft["properties"] for ft in data["features"]]
+        cat_z   = [p[f"Gi_z_{cat}"] for p in props]
+        cat_cls = [p[f"class_{cat}"] for p in props]
+        layers.append({
+            "key"    : cat,
+            "label"  : cat.replace("_", " ").title(),
+            "maxZ"   : round(max(cat_z), 4),
+            "minZ"   : round(min(cat_z), 3),
+            "fac"    : int(sum(p[f"count_{cat}"] for p in props)),
+            "sigHot" : sum(c in ("Hot Spot 99%", "Hot Spot 95%") for c in cat_cls),
+            "sigCold": sum(c in ("Cold Spot 99%", "Cold Spot 95%") for c in cat_cls),
+        })
+layers_str = json.dumps(layers, separators=(",", ":"))
+
 # ── HTML template ─────────────────────────────────────────────────────
 html = """<!DOCTYPE html>
 <html lang="en">
@@ -108,6 +133,14 @@ html = """<!DOCTYPE html>
     .irow{display:flex;justify-content:space-between;gap:10px;margin-bottom:3px}
     .irow .iv{color:#5bc0de;font-weight:700}
 
+    /* LAYER SWITCHER */
+    .layersel{background:rgba(12,14,26,.94);border:1px solid #2a2a5a;border-radius:8px;
+              padding:8px 11px;box-shadow:0 4px 20px rgba(0,0,0,.6)}
+    .layersel h4{font-size:9.5px;font-weight:700;text-transform:uppercase;letter-spacing:1px;
+                 color:#5555aa;margin-bottom:6px}
+    .layersel select{background:#0f3460;color:#e0e0f0;border:1px solid #2244aa;
+                     border-radius:4px;font-size:11px;padding:3px 6px;width:100%}
+
     /* TOOLTIP */
     .leaflet-tooltip{background:rgba(12,14,26,.93);border:1px solid #2a2a5a;color:#e0e0f0;
                      font-size:11px;border-radius:5px;padding:4px 8px;
@@ -124,10 +157,10 @@ html = """<!DOCTYPE html>
   </div>
   <div class="spacer"></div>
   <div class="chip"><div class="v">TOTAL_CELLS</div><div class="l">Grid Cells</div></div>
-  <div class="chip"><div class="v">TOTAL_FAC</div><div class="l">Facilities</div></div>
-  <div class="chip"><div class="v" style="color:#d7191c">SIG_HOT</div><div class="l">Hot p&lt;.05</div></div>
-  <div class="chip"><div class="v" style="color:#4db3d7">SIG_COLD</div><div class="l">Cold p&lt;.05</div></div>
-  <div class="chip"><div class="v" style="color:#ffd700">MAX_Z</div><div class="l">Max Z-Score</div></div>
+  <div class="chip"><div class="v" id="st-fac">TOTAL_FAC</div><div class="l">Facilities</div></div>
+  <div class="chip"><div class="v" id="st-hot" style="color:#d7191c">SIG_HOT</div><div class="l">Hot p&lt;.05</div></div>
+  <div class="chip"><div class="v" id="st-cold" style="color:#4db3d7">SIG_COLD</div><div class="l">Cold p&lt;.05</div></div>
+  <div class="chip"><div class="v" id="st-maxz" style="color:#ffd700">MAX_Z</div><div class="l">Max Z-Score</div></div>
 </div>
 
 <div id="map"></div>
@@ -149,7 +182,24 @@ const CLASS_ORDER = [
   "Not Significant",
   "Cold Spot 90%","Cold Spot 95%","Cold Spot 99%"
 ];
-const MAX_Z = MAX_Z_PLACEHOLDER;
+const LAYERS = LAYERS_PLACEHOLDER;
+let ACTIVE = LAYERS[0];
+
+// Property of the active layer: "class" → "class_school" etc.
+function prop(p, name) { return ACTIVE.key ? p[name + "_" + ACTIVE.key] : p[name]; }
+
+// Header chips and info panel follow the active layer
+function renderStats() {
+  const set = (id, v) => { const el = document.getElementById(id); if (el) el.textContent = v; };
+  set("st-fac",   ACTIVE.fac);
+  set("st-hot",   ACTIVE.sigHot);
+  set("st-cold",  ACTIVE.sigCold.toLocaleString("en-US"));
+  set("st-maxz",  ACTIVE.maxZ.toFixed(2));
+  set("st-layer", ACTIVE.label);
+  set("st-maxz2", "+" + ACTIVE.maxZ.toFixed(3));
+  set("st-minz",  ACTIVE.minZ.toFixed(3));
+  set("st-fac2",  ACTIVE.fac);
+}
 
 // ── Map init ──────────────────────────────────────────────────────
 const map = L.map("map",{center:[21.955,96.09],zoom:11,zoomControl:false});
@@ -174,7 +224,7 @@ const classCounts = {};
 CLASS_ORDER.forEach(cls => { layerGroups[cls] = L.layerGroup(); classCounts[cls] = 0; });
 
 function styleFn(feature) {
-  const cls = feature.properties.class;
+  const cls = prop(feature.properties, "class");
   const st  = CLASS_STYLE[cls] || {color:"#888"};
   const isNS = cls === "Not Significant";
   return {
@@ -185,10 +235,12 @@ function styleFn(feature) {
   };
 }
 
-function popupHTML(p) {
+function popupHTML(props) {
+  const p = {class: prop(props, "class"), Gi_z: prop(props, "Gi_z"),
+             Gi_p: prop(props, "Gi_p"), count: prop(props, "count")};
   const st = CLASS_STYLE[p.class] || {badgeColor:"#888",color:"#888"};
   const absZ = Math.abs(p.Gi_z);
-  const barW = Math.min(absZ / MAX_Z * 100, 100).toFixed(1);
+  const barW = Math.min(absZ / ACTIVE.maxZ * 100, 100).toFixed(1);
   const sigTag = p.Gi_p < 0.01
     ? '<span style="color:#d7191c;font-size:9px"> *** p&lt;0.01</span>'
     : p.Gi_p < 0.05
@@ -207,7 +259,7 @@ function popupHTML(p) {
     <div class="pgrid">
       <span class="k">Gi* Z-score</span><span class="v" style="color:${zColor}">${zStr}</span>
       <span class="k">p-value</span><span class="v">${p.Gi_p.toFixed(4)}${sigTag}</span>
-      <span class="k">Facilities</span><span class="v">${p.count}</span>
+      <span class="k">${ACTIVE.key ? ACTIVE.label : "Facilities"}</span><span class="v">${p.count}</span>
     </div>
     ${p.class !== "Not Significant" ? `
     <div class="zbar-wrap">
@@ -217,36 +269,42 @@ function popupHTML(p) {
   </div>`;
 }
 
-HOTSPOT_DATA.features.forEach(ft => {
-  const cls = ft.properties.class;
-  if (!layerGroups[cls]) return;
-  classCounts[cls]++;
-  const lyr = L.geoJSON(ft, {
-    style: styleFn,
-    onEachFeature(feature, layer) {
-      const p = feature.properties;
-      const zStr = (p.Gi_z > 0 ? "+" : "") + p.Gi_z.toFixed(3);
-      layer.bindTooltip(
-        `<b>${p.class}</b> &nbsp; Z = ${zStr} &nbsp;|&nbsp; Facilities: ${p.count}`,
-        {sticky:true, opacity:0.95}
-      );
-      layer.bindPopup(popupHTML(p), {maxWidth:270});
-      layer.on("mouseover", function() {
-        if (p.class !== "Not Significant") {
-          this.setStyle({fillOpacity:0.95, weight:1.8, color:"rgba(255,255,255,0.7)"});
-          this.bringToFront();
-        }
-      });
-      layer.on("mouseout", function() { this.setStyle(styleFn(feature)); });
-    },
+function buildLayers() {
+  CLASS_ORDER.forEach(cls => { layerGroups[cls].clearLayers(); classCounts[cls] = 0; });
+  HOTSPOT_DATA.features.forEach(ft => {
+    const cls = prop(ft.properties, "class");
+    if (!layerGroups[cls]) return;
+    classCounts[cls]++;
+    const lyr = L.geoJSON(ft, {
+      style: styleFn,
+      onEachFeature(feature, layer) {
+        const p = feature.properties;
+        const z = prop(p, "Gi_z");
+        const zStr = (z > 0 ? "+" : "") + z.toFixed(3);
+        layer.bindTooltip(
+          `<b>${cls}</b> &nbsp; Z = ${zStr} &nbsp;|&nbsp; ${ACTIVE.label}: ${prop(p, "count")}`,
+          {sticky:true, opacity:0.95}
+        );
+        layer.bindPopup(popupHTML(p), {maxWidth:270});
+        layer.on("mouseover", function() {
+          if (cls !== "Not Significant") {
+            this.setStyle({fillOpacity:0.95, weight:1.8, color:"rgba(255,255,255,0.7)"});
+            this.bringToFront();
+          }
+        });
+        layer.on("mouseout", function() { this.setStyle(styleFn(feature)); });
+      },
+    });
+    layerGroups[cls].addLayer(lyr);
   });
-  layerGroups[cls].addLayer(lyr);
-});
+}
+buildLayers();
 
 // Add layers to map (NS first = bottom)
 [...CLASS_ORDER].reverse().forEach(cls => layerGroups[cls].addTo(map));
 
 // ── Legend ────────────────────────────────────────────────────────
+let renderLegend = () => {};
 const legendCtrl = L.control({position:"bottomleft"});
 legendCtrl.onAdd = function() {
   const div = L.DomUtil.create("div","legend");
@@ -282,10 +340,38 @@ legendCtrl.onAdd = function() {
     div.appendChild(note);
   }
   render();
+  renderLegend = render;
   return div;
 };
 legendCtrl.addTo(map);
 
+// ── Amenity layer switcher ────────────────────────────────────────
+if (LAYERS.length > 1) {
+  const layerCtrl = L.control({position:"topleft"});
+  layerCtrl.onAdd = function() {
+    const div = L.DomUtil.create("div","layersel");
+    L.DomEvent.disableClickPropagation(div);
+    div.innerHTML = "<h4>Facility Layer</h4>";
+    const sel = document.createElement("select");
+    LAYERS.forEach((lyr, i) => {
+      const opt = document.createElement("option");
+      opt.value = i;
+      opt.textContent = lyr.label;
+      sel.appendChild(opt);
+    });
+    sel.onchange = () => {
+      ACTIVE = LAYERS[+sel.value];
+      map.closePopup();
+      buildLayers();
+      renderLegend();
+      renderStats();
+    };
+    div.appendChild(sel);
+    return div;
+  };
+  layerCtrl.addTo(map);
+}
+
 // ── Info panel ────────────────────────────────────────────────────
 const infoCtrl = L.control({position:"bottomright"});
 infoCtrl.onAdd = function() {
@@ -298,9 +384,10 @@ infoCtrl.onAdd = function() {
     <div class="irow"><span>Distance</span>     <span class="iv">1,500 m band</span></div>
     <div class="irow"><span>Weights</span>      <span class="iv">Row-standardised</span></div>
     <div class="irow"><span>Permutations</span> <span class="iv">999</span></div>
-    <div class="irow"><span>Max Z-score</span>  <span class="iv" style="color:#d7191c">+MAX_Z_DISP</span></div>
-    <div class="irow"><span>Min Z-score</span>  <span class="iv" style="color:#4db3d7">MIN_Z_DISP</span></div>
-    <div class="irow"><span>Facilities</span>   <span class="iv">TOTAL_FAC_DISP</span></div>
+    <div class="irow"><span>Layer</span>        <span class="iv" id="st-layer">All facilities</span></div>
+    <div class="irow"><span>Max Z-score</span>  <span class="iv" id="st-maxz2" style="color:#d7191c">+MAX_Z_DISP</span></div>
+    <div class="irow"><span>Min Z-score</span>  <span class="iv" id="st-minz" style="color:#4db3d7">MIN_Z_DISP</span></div>
+    <div class="irow"><span>Facilities</span>   <span class="iv" id="st-fac2">TOTAL_FAC_DISP</span></div>
     <div class="irow"><span>CRS</span>          <span class="iv">WGS 84 (EPSG:4326)</span></div>
   `;
   return div;
@@ -319,15 +406,16 @@ map.fitBounds(L.geoJSON(HOTSPOT_DATA).getBounds(), {padding:[20,20]});
 
 # ── Inject dynamic values ──────────────────────────────────────────
 html = html.replace("GEOJSON_PLACEHOLDER", geojson_str)
-html = html.replace("MAX_Z_PLACEHOLDER", str(max_z_r))
+html = html.replace("LAYERS_PLACEHOLDER", layers_str)
+# (longer placeholders first: MAX_Z is a prefix of MAX_Z_DISP, etc.)
+html = html.replace("MAX_Z_DISP", str(round(max_z, 3)))
+html = html.replace("MIN_Z_DISP", str(round(min_z, 3)))
+html = html.replace("TOTAL_FAC_DISP", str(int(total_fac)))
 html = html.replace("TOTAL_CELLS", f"{total:,}")
 html = html.replace("TOTAL_FAC", str(int(total_fac)))
 html = html.replace("SIG_HOT",  str(sig_hot))
 html = html.replace("SIG_COLD", f"{sig_cold:,}")
 html = html.replace("MAX_Z",    str(round(max_z, 2)))
-html = html.replace("MAX_Z_DISP", str(round(max_z, 3)))
-html = html.replace("MIN_Z_DISP", str(round(min_z, 3)))
-html = html.replace("TOTAL_FAC_DISP", str(int(total_fac)))
 
 out = r"C:\Users\Tin Ko Oo\Desktop\demo\mandalay_hotspot_webmap.html"
 with open(out, "w", encoding="utf-8") as f:
@@ -3,6 +3,7 @@ Spatial Hot Spot Analysis (Getis-Ord Gi*) for Educational Facilities in Mandalay
 Dataset: HOTOSM Myanmar Education Facilities Points
 """
 
+import inspect
 import json
 import numpy as np
 import geopandas as gpd
@@ -13,12 +14,34 @@ import matplotlib.patches as mpatches
 from matplotlib.colors import BoundaryNorm, ListedColormap
 from matplotlib.colorbar import ColorbarBase
 import matplotlib.gridspec as gridspec
-from scipy import stats
-from libpysal.weights import DistanceBand
-from esda.getisord import G_Local
+from scipy import sparse, stats
+from libpysal.weights import DistanceBand, WSP
+from stage_cache import StageCache, file_hash, pack_geoms, unpack_geoms
 import warnings
+try:
+    import rasterio
+    from rasterio.transform import from_origin
+except ImportError:   # optional – the raster export falls back to a .npy stack
+    rasterio = None
 warnings.filterwarnings("ignore")
 
+# ─────────────────────────────────────────────────────────────────────────────
+# 0. STAGE CACHE  (stage_cache.py – a rerun recomputes only the stages whose
+#    inputs or parameters changed; e.g. restyling the plots reuses the grid,
+#    weights and 999 permutations from the previous run)
+# ─────────────────────────────────────────────────────────────────────────────
+USE_CACHE = True
+CACHE_DIR = r"C:\Users\Tin Ko Oo\Desktop\demo\.hotspot_cache"
+CACHE_MB  = 512       # least recently used stages are evicted beyond this size
+CACHE_VERSION = 2     # part of every stage key – bump it whenever the code of a
+                      # stage changes (binning, weights, Gi* moments, permutations)
+
+cache = StageCache(CACHE_DIR, max_bytes=CACHE_MB * 1024 ** 2, enabled=USE_CACHE,
+                   version=CACHE_VERSION)
+
+def cached(hit):
+    return "  (cached)" if hit is not None else ""
+
 # ─────────────────────────────────────────────────────────────────────────────
 # 1. LOAD DATA
 # ─────────────────────────────────────────────────────────────────────────────
@@ -27,14 +50,8 @@ print("  SPATIAL HOT SPOT ANALYSIS – MANDALAY DISTRICT")
 print("  Method: Getis-Ord Gi*  |  Dataset: HOTOSM Myanmar")
 print("=" * 65)
 
-with open(
-    r"C:\Users\Tin Ko Oo\Desktop\demo\hotosm_mmr_education_facilities_points_geojson.geojson",
-    encoding="utf-8",
-) as f:
-    raw = json.load(f)
-
-gdf_all = gpd.GeoDataFrame.from_features(raw["features"], crs="EPSG:4326")
-print(f"\n[1] Raw dataset loaded: {len(gdf_all):,} features across Myanmar")
+SRC_PATH = r"C:\Users\Tin Ko Oo\Desktop\demo\hotosm_mmr_education_facilities_points_geojson.geojson"
+src_hash = file_hash(SRC_PATH)
 
 # ─────────────────────────────────────────────────────────────────────────────
 # 2. CLIP TO MANDALAY DISTRICT  (approximate bounding box)
@@ -44,7 +61,34 @@ print(f"\n[1] Raw dataset loaded: {len(gdf_all):,} features across Myanmar")
 MANDALAY_BBOX = (95.85, 21.70, 96.45, 22.20)   # (min_lon, min_lat, max_lon, max_lat)
 mandalay_box  = box(*MANDALAY_BBOX)
 
-gdf = gdf_all[gdf_all.geometry.within(mandalay_box)].copy().reset_index(drop=True)
+key_pts = cache.key("points", source=src_hash, bbox=MANDALAY_BBOX)
+hit = cache.load(key_pts, expect=("n_raw", "lon", "lat", "amenity"))
+if hit is None:
+    with open(SRC_PATH, encoding="utf-8") as f:
+        raw = json.load(f)
+
+    gdf_all = gpd.GeoDataFrame.from_features(raw["features"], crs="EPSG:4326")
+    n_raw   = len(gdf_all)
+
+    gdf = gdf_all[gdf_all.geometry.within(mandalay_box)].copy().reset_index(drop=True)
+    if "amenity" not in gdf.columns:
+        gdf["amenity"] = None
+    cache.save(
+        key_pts,
+        n_raw=np.int64(n_raw),
+        lon=gdf.geometry.x.values,
+        lat=gdf.geometry.y.values,
+        amenity=gdf["amenity"].fillna("").to_numpy(dtype=str),
+    )
+else:
+    n_raw = int(hit["n_raw"])
+    gdf = gpd.GeoDataFrame(
+        {"amenity": np.where(hit["amenity"] == "", None, hit["amenity"])},
+        geometry=gpd.points_from_xy(hit["lon"], hit["lat"]),
+        crs="EPSG:4326",
+    )
+
+print(f"\n[1] Raw dataset loaded: {n_raw:,} features across Myanmar{cached(hit)}")
 print(f"[2] Mandalay District clip: {len(gdf):,} facilities retained")
 print(f"    Bounding box: lon [{MANDALAY_BBOX[0]}, {MANDALAY_BBOX[2]}]  "
       f"lat [{MANDALAY_BBOX[1]}, {MANDALAY_BBOX[3]}]")
@@ -54,14 +98,15 @@ if len(gdf) < 10:
 
 # Amenity breakdown
 print("\n[3] Facility types in Mandalay District:")
-if "amenity" in gdf.columns:
-    for val, cnt in gdf["amenity"].value_counts().items():
-        print(f"    {val:<25} {cnt:>4}")
+for val, cnt in gdf["amenity"].value_counts().items():
+    print(f"    {val:<25} {cnt:>4}")
 
 # ─────────────────────────────────────────────────────────────────────────────
 # 3. PROJECT TO METRIC CRS  (UTM zone 47N – covers central Myanmar)
 # ─────────────────────────────────────────────────────────────────────────────
-gdf_utm = gdf.to_crs("EPSG:32647")   # WGS 84 / UTM zone 47N
+UTM_CRS = "EPSG:32647"   # WGS 84 / UTM zone 47N
+
+gdf_utm = gdf.to_crs(UTM_CRS)
 
 # ─────────────────────────────────────────────────────────────────────────────
 # 4. BUILD REGULAR FISHNET GRID  (cell size ≈ 500 m × 500 m)
@@ -71,43 +116,71 @@ CELL_M = 500          # grid resolution in metres
 bounds = gdf_utm.total_bounds   # (minx, miny, maxx, maxy)
 xs = np.arange(bounds[0], bounds[2] + CELL_M, CELL_M)
 ys = np.arange(bounds[1], bounds[3] + CELL_M, CELL_M)
+n_rows, n_cols = len(ys) - 1, len(xs) - 1
+
+# Point → fishnet cell, straight from the regular grid geometry. Every point
+# gets exactly one cell (a point on a shared edge goes to the upper / right
+# cell, the points defining the bounds to the last row / column), so the
+# overall count and the per-amenity counts (step 7b) always add up.
+pt_row = np.clip(((gdf_utm.geometry.y.values - ys[0]) // CELL_M).astype(int), 0, n_rows - 1)
+pt_col = np.clip(((gdf_utm.geometry.x.values - xs[0]) // CELL_M).astype(int), 0, n_cols - 1)
+
+key_grid = cache.key("grid", points=key_pts, crs=UTM_CRS, cell_m=CELL_M)
+hit = cache.load(key_grid, expect=("row", "col", "cx", "cy", "count",
+                                   "geom_buf", "geom_off"))
+if hit is None:
+    rows, cols = [], []
+    polygons   = []
+    cx_list, cy_list = [], []
+
+    for i, y0 in enumerate(ys[:-1]):
+        for j, x0 in enumerate(xs[:-1]):
+            cell = box(x0, y0, x0 + CELL_M, y0 + CELL_M)
+            polygons.append(cell)
+            rows.append(i)
+            cols.append(j)
+            cx_list.append(x0 + CELL_M / 2)
+            cy_list.append(y0 + CELL_M / 2)
+
+    grid = gpd.GeoDataFrame(
+        {"row": rows, "col": cols, "cx": cx_list, "cy": cy_list},
+        geometry=polygons,
+        crs=UTM_CRS,
+    )
 
-rows, cols = [], []
-polygons   = []
-cx_list, cy_list = [], []
-
-for i, y0 in enumerate(ys[:-1]):
-    for j, x0 in enumerate(xs[:-1]):
-        cell = box(x0, y0, x0 + CELL_M, y0 + CELL_M)
-        polygons.append(cell)
-        rows.append(i)
-        cols.append(j)
-        cx_list.append(x0 + CELL_M / 2)
-        cy_list.append(y0 + CELL_M / 2)
-
-grid = gpd.GeoDataFrame(
-    {"row": rows, "col": cols, "cx": cx_list, "cy": cy_list},
-    geometry=polygons,
-    crs="EPSG:32647",
-)
+    # Count facilities per cell (cells are in row-major order)
+    grid["count"] = np.bincount(pt_row * n_cols + pt_col, minlength=n_rows * n_cols)
 
-# Spatial join: count facilities per cell
-joined = gpd.sjoin(gdf_utm, grid, how="left", predicate="within")
-counts = joined.groupby("index_right").size().rename("count")
-grid   = grid.join(counts, how="left")
-grid["count"] = grid["count"].fillna(0).astype(int)
+    # Drop cells completely outside the area of interest
+    study_area_utm = gpd.GeoDataFrame(
+        geometry=[mandalay_box], crs="EPSG:4326"
+    ).to_crs(UTM_CRS)
 
-# Drop cells completely outside the area of interest
-study_area_utm = gpd.GeoDataFrame(
-    geometry=[mandalay_box], crs="EPSG:4326"
-).to_crs("EPSG:32647")
+    grid = gpd.overlay(grid, study_area_utm, how="intersection")
+    grid = grid.reset_index(drop=True)
 
-grid = gpd.overlay(grid, study_area_utm, how="intersection")
-grid = grid.reset_index(drop=True)
+    geom_buf, geom_off = pack_geoms(grid.geometry.values)
+    cache.save(
+        key_grid,
+        row=grid["row"].values, col=grid["col"].values,
+        cx=grid["cx"].values, cy=grid["cy"].values,
+        count=grid["count"].values,
+        geom_buf=geom_buf, geom_off=geom_off,
+    )
+else:
+    grid = gpd.GeoDataFrame(
+        {k: hit[k] for k in ("row", "col", "cx", "cy", "count")},
+        geometry=unpack_geoms(hit["geom_buf"], hit["geom_off"]),
+        crs=UTM_CRS,
+    )
 
 n_cells   = len(grid)
+cell_lookup = np.full((n_rows, n_cols), -1, dtype=np.int64)
+cell_lookup[grid["row"].values, grid["col"].values] = np.arange(n_cells)
+pt_cell = cell_lookup[pt_row, pt_col]   # index into grid, -1 if clipped away
+
 n_nonzero = (grid["count"] > 0).sum()
-print(f"\n[4] Grid created: {n_cells:,} cells  ({CELL_M} m × {CELL_M} m)")
+print(f"\n[4] Grid created: {n_cells:,} cells  ({CELL_M} m × {CELL_M} m){cached(hit)}")
 print(f"    Cells with ≥ 1 facility: {n_nonzero:,}  "
       f"({100*n_nonzero/n_cells:.1f} %)")
 print(f"    Max facilities per cell : {grid['count'].max()}")
@@ -118,24 +191,113 @@ print(f"    Mean per occupied cell  : {grid.loc[grid['count']>0,'count'].mean():
 # ─────────────────────────────────────────────────────────────────────────────
 THRESH_M = 1500   # neighbourhood radius
 
-coords = np.column_stack([grid.geometry.centroid.x, grid.geometry.centroid.y])
-w = DistanceBand(coords, threshold=THRESH_M, binary=True, silence_warnings=True)
+key_w = cache.key("weights", grid=key_grid, thresh_m=THRESH_M)
+hit = cache.load(key_w, expect=("indptr", "indices"))
+if hit is None:
+    coords = np.column_stack([grid.geometry.centroid.x, grid.geometry.centroid.y])
+    w = DistanceBand(coords, threshold=THRESH_M, binary=True, silence_warnings=True)
+    adj = w.sparse.tocsr()
+    cache.save(key_w, indptr=adj.indptr, indices=adj.indices)
+else:
+    adj = sparse.csr_matrix(
+        (np.ones(len(hit["indices"])), hit["indices"], hit["indptr"]),
+        shape=(n_cells, n_cells),
+    )
+    w = WSP(adj).to_W(silence_warnings=True)
 w.transform = "r"   # row-standardise
 
-print(f"\n[5] Spatial weights matrix built")
+print(f"\n[5] Spatial weights matrix built{cached(hit)}")
 print(f"    Distance threshold : {THRESH_M:,} m")
 print(f"    Mean neighbours    : {w.mean_neighbors:.1f}")
 
 # ─────────────────────────────────────────────────────────────────────────────
 # 6. GETIS-ORD Gi*  (local G statistic with row-standardised weights)
+#    All facilities (column 0 of Y) and, with AMENITY_LAYERS, one layer per
+#    amenity category are evaluated in one batched pass: the categories are
+#    binned with one 2-D bincount (cell × category) on step 4's point → cell
+#    index, the distance-band weights from step 5 serve every layer, and Gi*
+#    is one sparse matrix product. Permutation inference shares one set of
+#    random neighbour draws across cells and layers (conditional
+#    randomisation, cell i held fixed), so every layer is tested the same way.
 # ─────────────────────────────────────────────────────────────────────────────
-y = grid["count"].values.astype(float)
-gi = G_Local(y, w, transform="r", star=True, permutations=999)
-
-grid["Gi_z"]  = gi.Zs        # z-score
-grid["Gi_p"]  = gi.p_sim     # simulated p-value
-grid["Gi_EV"] = gi.EGs       # expected value
-grid["Gi_VR"] = gi.VGs       # variance
+PERMUTATIONS   = 999     # conditional randomisation draws
+SEED           = 12345   # fixed so that cached and fresh runs agree
+AMENITY_LAYERS = True    # also compute one hot spot layer per amenity category
+
+amenity_cats = []
+if AMENITY_LAYERS:
+    has_cat = gdf_utm["amenity"].notna().values
+    # Factorize the normalised name (used in the column names), so variants
+    # such as "School" and "school " form one layer rather than colliding
+    cat_names = (gdf_utm.loc[has_cat, "amenity"].astype(str)
+                 .str.strip().str.lower().str.replace(" ", "_"))
+    cat_codes, cat_index = pd.factorize(cat_names, sort=True)
+    amenity_cats = list(cat_index)
+n_cat = len(amenity_cats)
+
+key_gi = cache.key(
+    "gi", points=key_pts, grid=key_grid, weights=key_w, cats=amenity_cats,
+    permutations=PERMUTATIONS, seed=SEED,
+)
+hit = cache.load(key_gi, expect=("Y", "Z", "P", "VG"))
+if hit is None:
+    # Layer matrix: all facilities, then one column per amenity category
+    # (cells from step 4's point → cell index, so the layers add up to `count`)
+    Y = np.zeros((n_cells, 1 + n_cat))
+    Y[:, 0] = grid["count"].values
+    if n_cat:
+        cat_cell = pt_cell[has_cat]
+        inside   = cat_cell >= 0
+        Y[:, 1:] = np.bincount(
+            cat_cell[inside] * n_cat + cat_codes[inside],
+            minlength=n_cells * n_cat,
+        ).reshape(n_cells, n_cat)
+
+    # Gi* weights: binary distance band from step 5 plus self, row-standardised
+    A = w.sparse.tocsr(copy=True)
+    A.data[:] = 1.0
+    A = (A + sparse.identity(n_cells, format="csr")).tocsr()
+    k_star = np.diff(A.indptr)
+    W_star = sparse.diags(1.0 / k_star) @ A
+
+    # Analytical Gi* moments (as in esda) for every layer at once; with
+    # row sums W_i = 1, W_i(n − W_i) / ((n − 1) n²) reduces to 1 / n²
+    y_sum = Y.sum(axis=0)
+    y_bar = y_sum / n_cells
+    s     = np.sqrt((Y ** 2).sum(axis=0) / n_cells - y_bar ** 2)
+    lag   = W_star @ Y                                  # (n_cells, n_layers)
+    G     = lag / y_sum
+    EG    = 1.0 / n_cells
+    VG    = (s / y_bar) ** 2 / n_cells ** 2
+    Z     = (G - EG) / np.sqrt(VG)
+
+    # Batched conditional permutation: one draw table for all cells and
+    # layers. Neighbourhood sums are compared (exact for counts), so ties
+    # with the observed value are counted consistently.
+    rng   = np.random.default_rng(SEED)
+    k_max = int(k_star.max()) - 1
+    rids  = np.array([rng.permutation(n_cells - 1)[:k_max] for _ in range(PERMUTATIONS)])
+    obs   = A @ Y                                       # (n_cells, n_layers)
+    larger = np.zeros(Y.shape, dtype=np.int64)
+    for i in range(n_cells):
+        ids = rids[:, :k_star[i] - 1]
+        ids = ids + (ids >= i)                          # skip cell i itself
+        sim = Y[i] + Y[ids].sum(axis=1)                 # (PERMUTATIONS, n_layers)
+        larger[i] = (sim >= obs[i]).sum(axis=0)
+    low = (PERMUTATIONS - larger) < larger
+    larger[low] = PERMUTATIONS - larger[low]
+    P = (larger + 1.0) / (PERMUTATIONS + 1.0)
+
+    cache.save(key_gi, Y=Y, Z=Z, P=P, VG=VG)
+else:
+    Y, Z, P, VG = hit["Y"], hit["Z"], hit["P"], hit["VG"]
+
+grid["Gi_z"]  = Z[:, 0]                # z-score
+grid["Gi_p"]  = P[:, 0]                # simulated p-value
+grid["Gi_EV"] = 1.0 / n_cells          # expected value
+grid["Gi_VR"] = VG[0]                  # variance
+print(f"    Gi* permutations   : {PERMUTATIONS}  "
+      f"({1 + n_cat} layers, batched){cached(hit)}")
 
 # ─────────────────────────────────────────────────────────────────────────────
 # 7. SIGNIFICANCE CLASSIFICATION
@@ -153,8 +315,6 @@ def classify(z, p):
     else:
         return "Not Significant"
 
-grid["class"] = [classify(z, p) for z, p in zip(grid["Gi_z"], grid["Gi_p"])]
-
 class_order = [
     "Hot Spot 99%", "Hot Spot 95%", "Hot Spot 90%",
     "Not Significant",
@@ -169,6 +329,22 @@ class_colors = {
     "Cold Spot 95%"  : "#4db3d7",
     "Cold Spot 99%"  : "#2c7bb6",
 }
+class_labels = np.array(class_order)   # class code → label (codes index class_order)
+classify_src = inspect.getsource(classify)   # editing the thresholds invalidates the cache
+
+key_cls = cache.key("class", gi=key_gi, classes=class_order, rule=classify_src)
+hit = cache.load(key_cls, expect=("code",))
+if hit is None:
+    class_code = np.array(                             # (n_cells, n_layers)
+        [[class_order.index(classify(z, p)) for z, p in zip(Z[:, j], P[:, j])]
+         for j in range(Z.shape[1])],
+        dtype=np.int8,
+    ).T
+    cache.save(key_cls, code=class_code)
+else:
+    class_code = hit["code"]
+
+grid["class"] = class_labels[class_code[:, 0]]
 
 # Summary table
 print("\n[6] Getis-Ord Gi* Classification Summary")
@@ -188,6 +364,25 @@ print(f"    Facilities in 95% Hot Spots: {grid.loc[grid['class']=='Hot Spot 95%'
 print(f"    Max Gi* z-score            : {grid['Gi_z'].max():.3f}")
 print(f"    Min Gi* z-score            : {grid['Gi_z'].min():.3f}")
 
+# ─────────────────────────────────────────────────────────────────────────────
+# 7b. PER-AMENITY LAYERS  (school, kindergarten, college, university …)
+#     Columns 1… of the batched Gi* pass in step 6 and of the class codes.
+# ─────────────────────────────────────────────────────────────────────────────
+for j, cat in enumerate(amenity_cats, start=1):
+    grid[f"count_{cat}"] = Y[:, j].astype(int)
+    grid[f"Gi_z_{cat}"]  = Z[:, j]
+    grid[f"Gi_p_{cat}"]  = P[:, j]
+    grid[f"class_{cat}"] = class_labels[class_code[:, j]]
+
+if amenity_cats:
+    print(f"\n[6b] Per-amenity Gi* layers  ({n_cat} categories, "
+          f"{PERMUTATIONS} permutations, batched)")
+    print(f"    {'Amenity':<16}  {'Facilities':>10}  {'Hot p<.05':>9}  {'Max z':>7}")
+    print("    " + "-" * 48)
+    for j, cat in enumerate(amenity_cats, start=1):
+        n_hot = ((P[:, j] < 0.05) & (Z[:, j] > 0)).sum()
+        print(f"    {cat:<16}  {int(Y[:, j].sum()):>10}  {n_hot:>9,}  {Z[:, j].max():>7.3f}")
+
 # ─────────────────────────────────────────────────────────────────────────────
 # 8. VISUALISATION
 # ─────────────────────────────────────────────────────────────────────────────
@@ -343,12 +538,88 @@ plt.close()
 print(f"\n[7] Map saved → {OUT_PATH}")
 
 # ─────────────────────────────────────────────────────────────────────────────
-# 9. EXPORT RESULTS AS GEOJSON  (for GIS use)
+# 9. EXPORT RESULTS  (for GIS use)
+#    geojson – cell polygons, WGS 84 (read by build_webmap.py)
+#    parquet – GeoParquet, zstd, with a bbox covering column so readers can
+#              skip row groups outside a query window
+#    fgb     – FlatGeobuf with a packed Hilbert R-tree spatial index
+#    raster  – one float32 band per attribute on the regular UTM grid; tiled,
+#              compressed GeoTIFF (or a memory-mappable .npy stack + .json
+#              sidecar if rasterio is not installed)
 # ─────────────────────────────────────────────────────────────────────────────
-out_geojson = r"C:\Users\Tin Ko Oo\Desktop\demo\mandalay_hotspot_results.geojson"
-export_cols = ["count", "Gi_z", "Gi_p", "class", "geometry"]
-grid_4326[export_cols].to_file(out_geojson, driver="GeoJSON")
-print(f"[8] Results GeoJSON → {out_geojson}")
+EXPORT_FORMATS = ("geojson", "parquet", "fgb", "raster")
+OUT_BASE = r"C:\Users\Tin Ko Oo\Desktop\demo\mandalay_hotspot_results"
+
+export_cols = ["count", "Gi_z", "Gi_p", "class"]
+for cat in amenity_cats:
+    export_cols += [f"count_{cat}", f"Gi_z_{cat}", f"Gi_p_{cat}", f"class_{cat}"]
+export_cols.append("geometry")
+results = grid_4326[export_cols]
+
+if "geojson" in EXPORT_FORMATS:
+    out_geojson = OUT_BASE + ".geojson"
+    results.to_file(out_geojson, driver="GeoJSON")
+    print(f"[8] Results GeoJSON    → {out_geojson}")
+
+if "parquet" in EXPORT_FORMATS:
+    out_parquet = OUT_BASE + ".parquet"
+    try:
+        try:
+            results.to_parquet(out_parquet, compression="zstd", write_covering_bbox=True)
+            print(f"    Results GeoParquet → {out_parquet}")
+        except TypeError:   # geopandas < 1.0 has no bbox covering column
+            results.to_parquet(out_parquet, compression="zstd")
+            print(f"    Results GeoParquet → {out_parquet}  "
+                  "(no bbox covering column – needs geopandas ≥ 1.0)")
+    except ImportError:
+        print("    GeoParquet skipped – install pyarrow")
+
+if "fgb" in EXPORT_FORMATS:
+    out_fgb = OUT_BASE + ".fgb"
+    results.to_file(out_fgb, driver="FlatGeobuf", SPATIAL_INDEX="YES")
+    print(f"    Results FlatGeobuf → {out_fgb}")
+
+if "raster" in EXPORT_FORMATS:
+    # The fishnet is regular in UTM, so every attribute is a dense array;
+    # class bands hold the index into class_order, cells outside the
+    # study area are NaN.
+    band_cols = [c for c in export_cols if c != "geometry"]
+    r_idx = n_rows - 1 - grid["row"].values   # raster row 0 is the north edge
+    c_idx = grid["col"].values
+
+    bands = np.full((len(band_cols), n_rows, n_cols), np.nan, dtype=np.float32)
+    for b, col in enumerate(band_cols):
+        vals = grid[col].values
+        if col.startswith("class"):
+            vals = pd.Categorical(vals, categories=class_order).codes
+        bands[b, r_idx, c_idx] = vals
+
+    if rasterio is not None:
+        out_raster = OUT_BASE + ".tif"
+        with rasterio.open(
+            out_raster, "w",
+            driver="GTiff", dtype="float32", nodata=np.nan,
+            width=n_cols, height=n_rows, count=len(band_cols),
+            crs=UTM_CRS, transform=from_origin(xs[0], ys[-1], CELL_M, CELL_M),
+            tiled=True, blockxsize=256, blockysize=256,
+            compress="deflate", predictor=3,
+        ) as dst:
+            dst.write(bands)
+            dst.descriptions = tuple(band_cols)
+            dst.update_tags(classes=";".join(class_order))
+    else:
+        out_raster = OUT_BASE + "_raster.npy"
+        np.save(out_raster, bands)
+        with open(OUT_BASE + "_raster.json", "w", encoding="utf-8") as f:
+            json.dump({
+                "bands"  : band_cols,
+                "crs"    : UTM_CRS,
+                "origin" : [float(xs[0]), float(ys[-1])],   # top-left corner
+                "cell_m" : CELL_M,
+                "nodata" : "NaN",
+                "classes": class_order,
+            }, f, indent=2)
+    print(f"    Results raster     → {out_raster}  ({len(band_cols)} bands)")
 
 # ─────────────────────────────────────────────────────────────────────────────
 # 10. SUMMARY INTERPRETATION
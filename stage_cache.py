@@ -0,0 +1,117 @@
+"""
+Content-addressed cache for the stages of hotspot_analysis.py
+
+Each stage (clipped points, count raster, weights, Gi* arrays, classification)
+is stored as one compressed NumPy archive (.npz, no pickling) whose file name
+is a hash of the stage's inputs and parameters. Keys are chained – every stage
+key includes the key of the stage it was computed from – so a changed input
+invalidates exactly the stages downstream of it. Keys also include a code
+version, so changing how a stage is computed invalidates every stage. The
+least recently used archives are evicted once the cache grows beyond its
+size limit.
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+import shapely
+
+
+def file_hash(path, chunk=1 << 20):
+    """SHA-256 of a file's contents (hex)."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def pack_geoms(geoms):
+    """Geometries → (uint8 WKB buffer, int64 offsets) for pickle-free storage."""
+    wkb     = shapely.to_wkb(np.asarray(geoms, dtype=object))
+    offsets = np.cumsum([0] + [len(b) for b in wkb], dtype=np.int64)
+    return np.frombuffer(b"".join(wkb), dtype=np.uint8), offsets
+
+
+def unpack_geoms(buf, offsets):
+    """Inverse of pack_geoms."""
+    raw = buf.tobytes()
+    wkb = [raw[a:b] for a, b in zip(offsets[:-1], offsets[1:])]
+    return shapely.from_wkb(np.array(wkb, dtype=object))
+
+
+class StageCache:
+    """Directory of stage archives keyed by a hash of their inputs."""
+
+    def __init__(self, root, max_bytes=512 * 1024 ** 2, enabled=True, version=1):
+        self.root      = root
+        self.max_bytes = max_bytes
+        self.enabled   = enabled
+        self.version   = version
+        if enabled:
+            os.makedirs(root, exist_ok=True)
+
+    def key(self, stage, **params):
+        """Stage name plus a digest of its (JSON-serialisable) parameters
+        and the cache version."""
+        params = dict(params, _version=self.version)
+        blob = json.dumps(params, sort_keys=True, default=str).encode("utf-8")
+        return f"{stage}-{hashlib.sha256(blob).hexdigest()[:24]}"
+
+    def _path(self, key):
+        return os.path.join(self.root, key + ".npz")
+
+    def load(self, key, expect=()):
+        """Dict of arrays for `key`, or None on a miss.
+
+        An archive that cannot be read, or that lacks any of the array names
+        in `expect` (e.g. written by an older layout), counts as a miss and
+        is deleted so the stage is recomputed and stored again.
+        """
+        path = self._path(key)
+        if not self.enabled or not os.path.exists(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as z:
+                arrays = {k: z[k] for k in z.files}
+        except Exception:
+            # truncated / corrupt archive (BadZipFile, EOFError, zlib.error, …)
+            arrays = None
+        if arrays is None or any(k not in arrays for k in expect):
+            os.remove(path)
+            return None
+        os.utime(path)   # mark as recently used for eviction
+        return arrays
+
+    def save(self, key, **arrays):
+        """Store `arrays` under `key`, then evict down to the size limit."""
+        if not self.enabled:
+            return
+        for name, a in arrays.items():
+            if np.asarray(a).dtype == object:
+                raise TypeError(f"stage array '{name}' has dtype object; "
+                                "store a numeric or fixed-width string array")
+        path = self._path(key)
+        tmp  = path + ".tmp.npz"
+        np.savez_compressed(tmp, **arrays)
+        os.replace(tmp, path)   # atomic: readers never see a partial archive
+        self.evict(keep=path)
+
+    def evict(self, keep=None):
+        """Delete least recently used archives until under max_bytes."""
+        entries = []
+        for name in os.listdir(self.root):
+            if name.endswith(".npz") and not name.endswith(".tmp.npz"):
+                path = os.path.join(self.root, name)
+                st = os.stat(path)
+                entries.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            os.remove(path)
+            total -= size